@@ -14,16 +14,17 @@ def sanitize_filename(title):
     # Limit length to avoid too long filenames
     return clean_title[:100]
 
-def download_audio(video_url, default_title="video"):
+def download_audio(video_url, default_title="video", output_dir=None):
     """
     Download audio from a YouTube video.
     
     :param video_url: URL of the YouTube video
     :param default_title: Default title if none is found
+    :param output_dir: Directory to save the audio in (defaults to the temp directory)
     :return: Tuple of (file_path, video_title) or (None, None) if download fails
     """
-    # Use temp directory directly
-    temp_dir = tempfile.gettempdir()
+    # Use temp directory directly unless told otherwise
+    temp_dir = output_dir or tempfile.gettempdir()
     
     ydl_opts = {
         'format': 'bestaudio/best',
@@ -0,0 +1,332 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs
+
+from youtube_search import search_youtube, UPLOAD_DATE_FILTERS, DURATION_FILTERS
+from audio_downloader import download_audio
+from audio_converter import convert_to_mp3
+from utils import create_summary_report
+
+RECORD_SEARCH = "search"
+RECORD_VIDEO = "video"
+
+STATUS_SEARCH_OK = "ok"
+STATUS_NO_RESULTS = "no_results"
+STATUS_SEARCH_FAILED = "search_failed"
+STATUS_CONVERTED = "converted"
+STATUS_DOWNLOAD_FAILED = "download_failed"
+STATUS_CONVERSION_FAILED = "conversion_failed"
+
+DEFAULT_OUTPUT_DIR = os.path.join(tempfile.gettempdir(), "youtube_audio_batch")
+
+
+def load_query_specs(path):
+    """
+    Read query specs from a JSON-lines file.
+
+    Each non-empty line is an object with a required ``primary_query`` and
+    optional ``secondary_query``, ``limit``, ``upload_date`` and ``duration``
+    keys, mirroring the fields of the /process form. Lines starting with
+    ``#`` are ignored.
+
+    :param path: Path to the query spec file
+    :return: List of normalised spec dicts
+    :raises ValueError: If a line is not a valid spec
+    """
+    specs = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            where = f"{path}:{line_number}"
+            try:
+                raw = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{where}: invalid JSON ({e})")
+            if not isinstance(raw, dict):
+                raise ValueError(f"{where}: expected a JSON object")
+            primary_query = raw.get("primary_query")
+            if not primary_query:
+                raise ValueError(f"{where}: missing 'primary_query'")
+            if not isinstance(primary_query, str):
+                raise ValueError(f"{where}: 'primary_query' must be a string, got {primary_query!r}")
+            secondary_query = raw.get("secondary_query") or ""
+            if not isinstance(secondary_query, str):
+                raise ValueError(f"{where}: 'secondary_query' must be a string, got {secondary_query!r}")
+            raw_limit = raw.get("limit", 10)
+            try:
+                # int() would quietly turn true into 1 and 5.7 into 5
+                if isinstance(raw_limit, (bool, float)):
+                    raise TypeError
+                limit = int(raw_limit)
+            except (TypeError, ValueError):
+                raise ValueError(f"{where}: 'limit' must be an integer, got {raw_limit!r}")
+            if limit < 1:
+                raise ValueError(f"{where}: 'limit' must be at least 1")
+            upload_date = raw.get("upload_date", "any")
+            if upload_date not in UPLOAD_DATE_FILTERS:
+                raise ValueError(f"{where}: 'upload_date' must be one of {', '.join(UPLOAD_DATE_FILTERS)}")
+            duration = raw.get("duration", "any")
+            if duration not in DURATION_FILTERS:
+                raise ValueError(f"{where}: 'duration' must be one of {', '.join(DURATION_FILTERS)}")
+            specs.append({
+                "primary_query": primary_query,
+                "secondary_query": secondary_query,
+                "limit": limit,
+                "upload_date": upload_date,
+                "duration": duration,
+            })
+    return specs
+
+
+def video_id(link):
+    """
+    Get a stable, filesystem-safe id for a video link.
+
+    Uses the YouTube id when the link has one, otherwise a hash of the link.
+    """
+    parsed = urlparse(link)
+    if parsed.hostname and parsed.hostname.endswith("youtu.be"):
+        candidate = parsed.path.strip("/")
+    else:
+        candidate = parse_qs(parsed.query).get("v", [""])[0]
+    if candidate and all(c.isalnum() or c in "-_" for c in candidate):
+        return candidate
+    return hashlib.sha1(link.encode("utf-8")).hexdigest()[:16]
+
+
+def load_completed(manifest_path):
+    """
+    Collect the videos already converted according to the manifest.
+
+    A video only counts as done while its MP3 is still on disk, so clearing
+    the output directory makes the next run redo that work.
+
+    :param manifest_path: Path to the JSON-lines manifest
+    :return: Dict mapping video id to its manifest record
+    """
+    completed = {}
+    if not os.path.exists(manifest_path):
+        return completed
+
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a truncated last line
+                logging.warning(f"Skipping unreadable manifest line: {line[:80]}")
+                continue
+            if not isinstance(record, dict) or record.get("type") != RECORD_VIDEO:
+                continue
+            if record.get("status") == STATUS_CONVERTED and record.get("mp3_file") and os.path.exists(record["mp3_file"]):
+                completed[record["video_id"]] = record
+
+    return completed
+
+
+class Manifest:
+    """Append-only JSON-lines writer that is safe to share between worker threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        record["finished_at"] = datetime.now(timezone.utc).isoformat()
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def process_video(video, spec, output_dir):
+    """
+    Download and convert a single video, timing each stage.
+
+    The audio is saved in a subdirectory named after the video id so that
+    videos sharing a title never write to the same file.
+
+    :param video: Video dict as returned by search_youtube
+    :param spec: Query spec the video was found by
+    :param output_dir: Directory under which each video gets its own subdirectory
+    :return: Manifest record describing the outcome
+    """
+    vid = video_id(video["link"])
+    record = {
+        "type": RECORD_VIDEO,
+        "video_id": vid,
+        "link": video["link"],
+        "title": video["title"],
+        "primary_query": spec["primary_query"],
+        "secondary_query": spec["secondary_query"],
+        "status": None,
+        "mp3_file": None,
+        "download_seconds": None,
+        "conversion_seconds": None,
+        "error": None,
+    }
+
+    video_dir = os.path.join(output_dir, vid)
+    start = time.monotonic()
+    try:
+        os.makedirs(video_dir, exist_ok=True)
+        audio_file, _ = download_audio(video["link"], video["title"], output_dir=video_dir)
+    except Exception as e:
+        logging.error(f"Error downloading {video['link']}: {str(e)}")
+        audio_file = None
+        record["error"] = str(e)
+    finally:
+        record["download_seconds"] = round(time.monotonic() - start, 3)
+    if not audio_file:
+        record["status"] = STATUS_DOWNLOAD_FAILED
+        return record
+
+    start = time.monotonic()
+    try:
+        mp3_file = convert_to_mp3(audio_file)
+    except Exception as e:
+        logging.error(f"Error converting {audio_file}: {str(e)}")
+        mp3_file = None
+        record["error"] = str(e)
+    finally:
+        record["conversion_seconds"] = round(time.monotonic() - start, 3)
+    if not mp3_file:
+        record["status"] = STATUS_CONVERSION_FAILED
+        return record
+
+    record["status"] = STATUS_CONVERTED
+    record["mp3_file"] = mp3_file
+    return record
+
+
+def _process_and_record(video, spec, output_dir, manifest):
+    record = process_video(video, spec, output_dir)
+    manifest.write(record)
+    logging.info(f"{record['status']}: {record['title']}")
+    return record
+
+
+def run_batch(specs, manifest_path, workers=4, output_dir=DEFAULT_OUTPUT_DIR):
+    """
+    Search every spec, then download and convert the results in parallel.
+
+    Every search and every processed video is appended to the manifest as
+    soon as it finishes, so an interrupted run loses no completed work.
+    Videos already converted in an earlier run are skipped, and a video that
+    turns up under several queries is only processed once.
+
+    :param specs: Query specs as returned by load_query_specs
+    :param manifest_path: Path to the JSON-lines manifest to resume from and append to
+    :param workers: Number of videos to download and convert concurrently
+    :param output_dir: Directory to save the MP3 files in
+    :return: List of manifest records written during this run
+    """
+    completed = load_completed(manifest_path)
+    manifest = Manifest(manifest_path)
+    if completed:
+        logging.info(f"Resuming: {len(completed)} videos already converted")
+
+    records = []
+    searches = []
+    for spec in specs:
+        start = time.monotonic()
+        error = None
+        try:
+            total_videos, videos = search_youtube(spec["primary_query"], spec["secondary_query"], spec["limit"], spec["upload_date"], spec["duration"])
+        except Exception as e:
+            # A failed search must not stop the remaining specs
+            logging.error(f"Error searching '{spec['primary_query']}': {str(e)}")
+            total_videos, videos = 0, []
+            error = str(e)
+        elapsed = round(time.monotonic() - start, 3)
+        if error:
+            status = STATUS_SEARCH_FAILED
+        else:
+            status = STATUS_SEARCH_OK if videos else STATUS_NO_RESULTS
+            logging.info(f"Search '{spec['primary_query']}' returned {len(videos)} of {total_videos} videos in {elapsed}s")
+        record = dict(spec, type=RECORD_SEARCH, status=status, total_videos=total_videos,
+                      videos_returned=len(videos), search_seconds=elapsed, error=error)
+        manifest.write(record)
+        records.append(record)
+        searches.append((spec, total_videos, videos))
+
+    outcomes = {}
+    skipped = 0
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = []
+        for spec, _, videos in searches:
+            for video in videos:
+                vid = video_id(video["link"])
+                if vid in outcomes:
+                    continue
+                if vid in completed:
+                    outcomes[vid] = completed[vid]
+                    skipped += 1
+                    continue
+                outcomes[vid] = None
+                futures.append(executor.submit(_process_and_record, video, spec, output_dir, manifest))
+
+        for future in as_completed(futures):
+            record = future.result()
+            outcomes[record["video_id"]] = record
+            records.append(record)
+    except BaseException:
+        # Drop queued videos; the ones already running still reach the manifest
+        logging.warning("Stopping batch: cancelling queued videos")
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+    logging.info(f"Processed {len(records) - len(searches)} videos, skipped {skipped} already converted")
+
+    for spec, total_videos, videos in searches:
+        results = [outcomes[vid] for vid in dict.fromkeys(video_id(video["link"]) for video in videos)]
+        successful_conversions = sum(1 for r in results if r["status"] == STATUS_CONVERTED)
+        successful_downloads = successful_conversions + sum(1 for r in results if r["status"] == STATUS_CONVERSION_FAILED)
+        create_summary_report(total_videos, len(videos), successful_downloads, successful_conversions, spec["primary_query"], spec["secondary_query"], spec["upload_date"], spec["duration"])
+
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search YouTube and extract MP3 audio for a batch of queries without the web app.")
+    parser.add_argument("specs", help="JSON-lines file of query specs (primary_query, secondary_query, limit, upload_date, duration)")
+    parser.add_argument("-m", "--manifest", default="batch_manifest.jsonl", help="JSON-lines manifest of search and per-video outcomes; rerunning resumes from it (default: %(default)s)")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Number of videos to process in parallel (default: %(default)s)")
+    parser.add_argument("-o", "--output-dir", default=DEFAULT_OUTPUT_DIR, help="Directory to save MP3 files in, one subdirectory per video (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    try:
+        specs = load_query_specs(args.specs)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    # Stored paths must stay valid when a later run starts from another directory
+    records = run_batch(specs, os.path.abspath(args.manifest), args.workers, os.path.abspath(args.output_dir))
+    ok_statuses = (STATUS_SEARCH_OK, STATUS_CONVERTED)
+    return 0 if all(r["status"] in ok_statuses for r in records) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
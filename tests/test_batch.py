@@ -0,0 +1,238 @@
+import json
+import os
+
+import pytest
+
+import batch
+
+
+def write_lines(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+
+
+def read_manifest(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def write_specs(tmp_path, specs):
+    path = tmp_path / "specs.jsonl"
+    write_lines(path, [json.dumps(s) for s in specs])
+    return path
+
+
+@pytest.fixture
+def fake_pipeline(monkeypatch):
+    """Replace search, download and convert with in-process fakes."""
+    state = {"results": {}, "downloads": [], "fail_download": set(), "raise_convert": set()}
+
+    def fake_search(primary_query, secondary_query, limit, upload_date, duration):
+        videos = state["results"].get(primary_query, [])
+        return len(videos), videos
+
+    def fake_download(video_url, default_title="video", output_dir=None):
+        state["downloads"].append(video_url)
+        if video_url in state["fail_download"]:
+            return None, None
+        wav_path = os.path.join(output_dir, f"{default_title}.wav")
+        with open(wav_path, "w") as f:
+            f.write(video_url)
+        return wav_path, default_title
+
+    def fake_convert(audio_file):
+        with open(audio_file) as f:
+            link = f.read()
+        if link in state["raise_convert"]:
+            raise RuntimeError("decoder crashed")
+        mp3_file = f"{os.path.splitext(audio_file)[0]}.mp3"
+        os.rename(audio_file, mp3_file)
+        return mp3_file
+
+    monkeypatch.setattr(batch, "search_youtube", fake_search)
+    monkeypatch.setattr(batch, "download_audio", fake_download)
+    monkeypatch.setattr(batch, "convert_to_mp3", fake_convert)
+    return state
+
+
+def video(vid, title):
+    return {"link": f"https://www.youtube.com/watch?v={vid}", "title": title}
+
+
+def spec(primary_query):
+    return {"primary_query": primary_query, "secondary_query": "", "limit": 10, "upload_date": "any", "duration": "any"}
+
+
+def test_load_query_specs_applies_defaults(tmp_path):
+    path = tmp_path / "specs.jsonl"
+    write_lines(path, [
+        "# comment",
+        "",
+        '{"primary_query": "adc", "limit": "5", "duration": "long"}',
+        '{"primary_query": "adc", "secondary_query": null}',
+    ])
+
+    assert batch.load_query_specs(path) == [
+        {"primary_query": "adc", "secondary_query": "", "limit": 5, "upload_date": "any", "duration": "long"},
+        {"primary_query": "adc", "secondary_query": "", "limit": 10, "upload_date": "any", "duration": "any"},
+    ]
+
+
+@pytest.mark.parametrize("line, message", [
+    ('["x"]', "expected a JSON object"),
+    ('{"primary_query": "a", "limit": null}', "'limit' must be an integer"),
+    ('{"primary_query": "a", "limit": 0}', "'limit' must be at least 1"),
+    ('{"primary_query": "a", "limit": true}', "'limit' must be an integer"),
+    ('{"primary_query": "a", "limit": 5.7}', "'limit' must be an integer"),
+    ('{"primary_query": 5}', "'primary_query' must be a string"),
+    ('{"primary_query": "a", "secondary_query": 3}', "'secondary_query' must be a string"),
+    ('{"primary_query": "a", "duration": "huge"}', "'duration' must be one of"),
+    ('{"primary_query": "a", "upload_date": "yesterday"}', "'upload_date' must be one of"),
+    ('{"secondary_query": "a"}', "missing 'primary_query'"),
+    ("{not json", "invalid JSON"),
+])
+def test_load_query_specs_rejects_bad_lines(tmp_path, line, message):
+    path = tmp_path / "specs.jsonl"
+    write_lines(path, ['{"primary_query": "ok"}', line])
+
+    with pytest.raises(ValueError, match=f":2: .*{message}"):
+        batch.load_query_specs(path)
+
+
+def test_video_id():
+    assert batch.video_id("https://www.youtube.com/watch?v=abc_-123&t=10") == "abc_-123"
+    assert batch.video_id("https://youtu.be/abc123") == "abc123"
+    assert batch.video_id("https://example.com/../x") == batch.video_id("https://example.com/../x")
+    assert "/" not in batch.video_id("https://example.com/../x")
+
+
+def test_load_completed(tmp_path):
+    kept = tmp_path / "kept.mp3"
+    kept.touch()
+
+    def record(vid, mp3_file, status=batch.STATUS_CONVERTED):
+        return json.dumps({"type": batch.RECORD_VIDEO, "video_id": vid, "status": status, "mp3_file": str(mp3_file)})
+
+    manifest = tmp_path / "manifest.jsonl"
+    write_lines(manifest, [
+        json.dumps({"type": batch.RECORD_SEARCH, "status": batch.STATUS_SEARCH_OK}),
+        record("kept", kept),
+        record("missing", tmp_path / "missing.mp3"),
+        record("failed", kept, status=batch.STATUS_DOWNLOAD_FAILED),
+        '{"type": "video", "video_id": "trunc',
+    ])
+
+    assert list(batch.load_completed(manifest)) == ["kept"]
+
+
+def test_run_batch_keeps_same_title_videos_apart(tmp_path, fake_pipeline):
+    fake_pipeline["results"]["q"] = [video("L1", "Same"), video("L2", "Same")]
+    manifest = tmp_path / "manifest.jsonl"
+
+    records = batch.run_batch([spec("q")], manifest, workers=2, output_dir=tmp_path / "out")
+
+    mp3_files = {r["video_id"]: r["mp3_file"] for r in records if r["type"] == batch.RECORD_VIDEO}
+    assert set(mp3_files) == {"L1", "L2"}
+    assert mp3_files["L1"] != mp3_files["L2"]
+    assert all(os.path.exists(path) for path in mp3_files.values())
+    assert set(batch.load_completed(manifest)) == {"L1", "L2"}
+
+
+def test_run_batch_dedups_across_queries_and_resumes(tmp_path, fake_pipeline):
+    fake_pipeline["results"]["q1"] = [video("A", "a"), video("B", "b")]
+    fake_pipeline["results"]["q2"] = [video("B", "b"), video("C", "c")]
+    fake_pipeline["fail_download"].add(video("C", "c")["link"])
+    manifest = tmp_path / "manifest.jsonl"
+    specs = [spec("q1"), spec("q2")]
+
+    assert batch.main([str(write_specs(tmp_path, specs)), "-m", str(manifest), "-o", str(tmp_path / "out")]) == 1
+    assert sorted(fake_pipeline["downloads"]) == sorted(video(v, "")["link"] for v in "ABC")
+
+    fake_pipeline["downloads"].clear()
+    fake_pipeline["fail_download"].clear()
+    assert batch.main([str(write_specs(tmp_path, specs)), "-m", str(manifest), "-o", str(tmp_path / "out")]) == 0
+    assert fake_pipeline["downloads"] == [video("C", "c")["link"]]
+
+    searches = [r for r in read_manifest(manifest) if r["type"] == batch.RECORD_SEARCH]
+    assert len(searches) == 4
+    assert all("search_seconds" in r for r in searches)
+
+
+def test_run_batch_records_conversion_errors_with_full_schema(tmp_path, fake_pipeline):
+    fake_pipeline["results"]["q"] = [video("A", "a"), video("B", "b")]
+    fake_pipeline["raise_convert"].add(video("B", "b")["link"])
+    manifest = tmp_path / "manifest.jsonl"
+
+    batch.run_batch([spec("q")], manifest, output_dir=tmp_path / "out")
+
+    videos = {r["video_id"]: r for r in read_manifest(manifest) if r["type"] == batch.RECORD_VIDEO}
+    assert videos["B"]["status"] == batch.STATUS_CONVERSION_FAILED
+    assert videos["B"]["error"] == "decoder crashed"
+    assert videos["B"]["conversion_seconds"] is not None
+    assert set(videos["A"]) == set(videos["B"])
+
+
+def test_run_batch_interrupt_cancels_queued_videos(tmp_path, fake_pipeline, monkeypatch):
+    fake_pipeline["results"]["q"] = [video(v, v) for v in "ABCDE"]
+    manifest = tmp_path / "manifest.jsonl"
+
+    real_as_completed = batch.as_completed
+
+    def fake_as_completed(futures):
+        # Simulate Ctrl-C once the first video has finished
+        for future in real_as_completed(futures):
+            yield future
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(batch, "as_completed", fake_as_completed)
+
+    with pytest.raises(KeyboardInterrupt):
+        batch.run_batch([spec("q")], manifest, workers=1, output_dir=tmp_path / "out")
+
+    # Every video that was downloaded made it into the manifest, and the queue was dropped
+    videos = [r for r in read_manifest(manifest) if r["type"] == batch.RECORD_VIDEO]
+    assert len(videos) == len(fake_pipeline["downloads"])
+    assert len(videos) < 5
+
+
+def test_main_fails_when_search_returns_nothing(tmp_path, fake_pipeline):
+    manifest = tmp_path / "manifest.jsonl"
+
+    assert batch.main([str(write_specs(tmp_path, [spec("broken")])), "-m", str(manifest)]) == 1
+    assert read_manifest(manifest)[0]["status"] == batch.STATUS_NO_RESULTS
+
+
+def test_run_batch_continues_after_search_raises(tmp_path, fake_pipeline, monkeypatch):
+    fake_pipeline["results"]["good"] = [video("A", "a")]
+    fake_search = batch.search_youtube
+
+    def flaky_search(primary_query, *args):
+        if primary_query == "broken":
+            raise OSError("network down")
+        return fake_search(primary_query, *args)
+
+    monkeypatch.setattr(batch, "search_youtube", flaky_search)
+    manifest = tmp_path / "manifest.jsonl"
+    specs = write_specs(tmp_path, [spec("broken"), spec("good")])
+
+    assert batch.main([str(specs), "-m", str(manifest), "-o", str(tmp_path / "out")]) == 1
+
+    records = read_manifest(manifest)
+    searches = {r["primary_query"]: r for r in records if r["type"] == batch.RECORD_SEARCH}
+    assert searches["broken"]["status"] == batch.STATUS_SEARCH_FAILED
+    assert searches["broken"]["error"] == "network down"
+    assert "search_seconds" in searches["broken"]
+    assert searches["good"]["status"] == batch.STATUS_SEARCH_OK
+    assert fake_pipeline["downloads"] == [video("A", "a")["link"]]
+
+
+def test_main_resumes_from_relative_paths_in_another_directory(tmp_path, fake_pipeline, monkeypatch):
+    fake_pipeline["results"]["q"] = [video("A", "a")]
+    specs = write_specs(tmp_path, [spec("q")])
+    monkeypatch.chdir(tmp_path)
+
+    assert batch.main([str(specs), "-m", "manifest.jsonl", "-o", "out"]) == 0
+
+    fake_pipeline["downloads"].clear()
+    (tmp_path / "elsewhere").mkdir()
+    monkeypatch.chdir(tmp_path / "elsewhere")
+    assert batch.main([str(specs), "-m", "../manifest.jsonl", "-o", "../out"]) == 0
+    assert fake_pipeline["downloads"] == []
@@ -5,6 +5,9 @@ import re
 import time
 from datetime import datetime, timedelta
 
+UPLOAD_DATE_FILTERS = ("any", "today", "this_week", "this_month", "this_year")
+DURATION_FILTERS = ("any", "short", "medium", "long")
+
 def search_youtube(primary_query: str, secondary_query: str = "", limit: int = 10, 
                   upload_date: str = "any", duration: str = "any") -> Tuple[int, List[Dict]]:
     """